@@ -2,12 +2,13 @@
 """Crawl GitHub repository stars"""
 import sys
 import os
+import logging
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.config import Config
-from src.github.client import GitHubClient
+from src.github.client import AsyncGitHubClient
 from src.database.connection import DatabaseConnection
 from src.database.repository import RepositoryStore
 from src.crawler.stars_crawler import StarsCrawler
@@ -15,6 +16,7 @@ from src.crawler.stars_crawler import StarsCrawler
 
 def main():
     """Main crawler entry point"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("Starting GitHub repository star crawler...")
     
     # Check for GitHub token
@@ -25,7 +27,7 @@ def main():
     
     try:
         # Initialize components
-        github_client = GitHubClient()
+        github_client = AsyncGitHubClient()
         db = DatabaseConnection()
         repository_store = RepositoryStore(db)
         
@@ -3,145 +3,187 @@
 import sys
 import os
 import json
-import csv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # Fall back to the (slower) stdlib encoder
+    orjson = None
+
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.connection import DatabaseConnection
 
 
+# Rows fetched per round trip when streaming from a server-side cursor
+FETCH_SIZE = 5000
+
+# Repositories with latest star counts, as exported to JSON/JSONL
+JSON_EXPORT_QUERY = """
+    SELECT 
+        r.id,
+        r.name,
+        r.owner,
+        r.full_name,
+        r.description,
+        r.url,
+        r.language,
+        r.is_private,
+        r.is_fork,
+        r.is_archived,
+        r.created_at,
+        r.updated_at,
+        r.pushed_at,
+        COALESCE(r.latest_star_count, 0) as star_count,
+        r.latest_crawled_at as last_crawled_at
+    FROM repositories r
+    ORDER BY r.full_name
+"""
+
+
+def _json_default(value):
+    """Serialize values the stdlib json encoder does not handle natively"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_json(payload) -> bytes:
+    """Encode payload as compact UTF-8 JSON, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(
+        payload, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
 def dump_to_csv(output_file: str = "repository_data.csv"):
-    """Dump repository data to CSV"""
+    """
+    Dump repository data to CSV.
+    
+    The CSV is produced by Postgres itself (COPY ... TO STDOUT) and streamed
+    straight to the file, so rows never become Python objects. Values use
+    Postgres' text format (booleans as t/f, timestamps as "YYYY-MM-DD HH:MM:SS").
+    """
     print(f"Dumping database to {output_file}...")
     
     db = DatabaseConnection()
     
-    with db.get_cursor() as cursor:
-        # Get repositories with latest star counts
-        cursor.execute("""
-            SELECT 
-                r.id,
-                r.name,
-                r.owner,
-                r.full_name,
-                r.description,
-                r.url,
-                r.language,
-                r.is_private,
-                r.is_fork,
-                r.is_archived,
-                COALESCE(lrs.star_count, 0) as star_count,
-                lrs.crawled_at as last_crawled_at
-            FROM repositories r
-            LEFT JOIN latest_repository_stars lrs ON r.id = lrs.repository_id
-            ORDER BY r.full_name
-        """)
-        
-        rows = cursor.fetchall()
-        
-        if not rows:
-            print("No data to dump")
-            return
-        
-        # Write to CSV
-        fieldnames = [
-            "id", "name", "owner", "full_name", "description", "url",
-            "language", "is_private", "is_fork", "is_archived",
-            "star_count", "last_crawled_at"
-        ]
-        
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for row in rows:
-                writer.writerow({
-                    "id": row["id"],
-                    "name": row["name"],
-                    "owner": row["owner"],
-                    "full_name": row["full_name"],
-                    "description": row["description"] or "",
-                    "url": row["url"],
-                    "language": row["language"] or "",
-                    "is_private": row["is_private"],
-                    "is_fork": row["is_fork"],
-                    "is_archived": row["is_archived"],
-                    "star_count": row["star_count"] or 0,
-                    "last_crawled_at": row["last_crawled_at"].isoformat() if row["last_crawled_at"] else "",
-                })
-        
-        print(f"Successfully dumped {len(rows):,} repositories to {output_file}")
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # Repositories with latest star counts
+            with open(output_file, 'wb') as f:
+                cursor.copy_expert("""
+                    COPY (
+                        SELECT 
+                            r.id,
+                            r.name,
+                            r.owner,
+                            r.full_name,
+                            r.description,
+                            r.url,
+                            r.language,
+                            r.is_private,
+                            r.is_fork,
+                            r.is_archived,
+                            COALESCE(r.latest_star_count, 0) as star_count,
+                            r.latest_crawled_at as last_crawled_at
+                        FROM repositories r
+                        ORDER BY r.full_name
+                    ) TO STDOUT WITH CSV HEADER
+                """, f)
+            row_count = cursor.rowcount
+        finally:
+            cursor.close()
+    
+    if row_count == 0:
+        print("No data to dump")
+        return
+    
+    print(f"Successfully dumped {row_count:,} repositories to {output_file}")
 
 
 def dump_to_json(output_file: str = "repository_data.json"):
-    """Dump repository data to JSON"""
+    """
+    Dump repository data to JSON.
+    
+    Rows are streamed from a server-side cursor and written one per line, a
+    fetched chunk at a time, so memory use does not grow with the number of
+    repositories.
+    The metadata object follows the repository list because the total is only
+    known once every row has been written.
+    """
     print(f"Dumping database to {output_file}...")
     
     db = DatabaseConnection()
     
-    with db.get_cursor() as cursor:
-        cursor.execute("""
-            SELECT 
-                r.id,
-                r.name,
-                r.owner,
-                r.full_name,
-                r.description,
-                r.url,
-                r.language,
-                r.is_private,
-                r.is_fork,
-                r.is_archived,
-                r.created_at,
-                r.updated_at,
-                r.pushed_at,
-                COALESCE(lrs.star_count, 0) as star_count,
-                lrs.crawled_at as last_crawled_at
-            FROM repositories r
-            LEFT JOIN latest_repository_stars lrs ON r.id = lrs.repository_id
-            ORDER BY r.full_name
-        """)
+    with db.get_cursor(name="dump_repositories", itersize=FETCH_SIZE) as cursor:
+        cursor.execute(JSON_EXPORT_QUERY)
         
-        rows = cursor.fetchall()
+        rows = cursor.fetchmany(FETCH_SIZE)
         
         if not rows:
             print("No data to dump")
             return
         
-        # Convert to list of dicts
-        data = []
-        for row in rows:
-            data.append({
-                "id": row["id"],
-                "name": row["name"],
-                "owner": row["owner"],
-                "full_name": row["full_name"],
-                "description": row["description"],
-                "url": row["url"],
-                "language": row["language"],
-                "is_private": row["is_private"],
-                "is_fork": row["is_fork"],
-                "is_archived": row["is_archived"],
-                "created_at": row["created_at"].isoformat() if row["created_at"] else None,
-                "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
-                "pushed_at": row["pushed_at"].isoformat() if row["pushed_at"] else None,
-                "star_count": row["star_count"] or 0,
-                "last_crawled_at": row["last_crawled_at"].isoformat() if row["last_crawled_at"] else None,
-            })
+        # Rows already carry the exported fields; datetimes are encoded as ISO 8601
+        count = 0
+        with open(output_file, 'wb') as f:
+            f.write(b'{"repositories":[\n')
+            while rows:
+                if count:
+                    f.write(b",\n")
+                f.write(b",\n".join(map(_encode_json, rows)))
+                count += len(rows)
+                rows = cursor.fetchmany(FETCH_SIZE)
+            f.write(b'\n],"metadata":')
+            f.write(_encode_json({
+                "exported_at": datetime.utcnow(),
+                "total_repositories": count
+            }))
+            f.write(b"}\n")
         
-        # Write to JSON
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "metadata": {
-                    "exported_at": datetime.utcnow().isoformat(),
-                    "total_repositories": len(data)
-                },
-                "repositories": data
-            }, f, indent=2, ensure_ascii=False)
+        print(f"Successfully dumped {count:,} repositories to {output_file}")
+
+
+def dump_to_jsonl(output_file: str = "repository_data.jsonl"):
+    """
+    Dump repository data to JSON Lines, one repository object per line.
+    
+    Consumers can parse the file incrementally. The export metadata is written
+    to a "<name>.meta.json" sidecar next to it.
+    """
+    print(f"Dumping database to {output_file}...")
+    
+    db = DatabaseConnection()
+    
+    with db.get_cursor(name="dump_repositories", itersize=FETCH_SIZE) as cursor:
+        cursor.execute(JSON_EXPORT_QUERY)
         
-        print(f"Successfully dumped {len(data):,} repositories to {output_file}")
+        count = 0
+        with open(output_file, 'wb') as f:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            while rows:
+                f.write(b"\n".join(map(_encode_json, rows)))
+                f.write(b"\n")
+                count += len(rows)
+                rows = cursor.fetchmany(FETCH_SIZE)
+    
+    if count == 0:
+        print("No data to dump")
+        return
+    
+    meta_file = os.path.splitext(output_file)[0] + ".meta.json"
+    with open(meta_file, 'wb') as f:
+        f.write(_encode_json({
+            "exported_at": datetime.utcnow(),
+            "total_repositories": count
+        }))
+    
+    print(f"Successfully dumped {count:,} repositories to {output_file}")
 
 
 def main():
@@ -155,6 +197,11 @@ def main():
         default="both",
         help="Output format"
     )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Write JSON as JSON Lines (repository_data.jsonl plus a .meta.json sidecar)"
+    )
     parser.add_argument(
         "--output-dir",
         default=".",
@@ -163,14 +210,21 @@ def main():
     
     args = parser.parse_args()
     
+    dumps = []
+    if args.format in ["csv", "both"]:
+        dumps.append((dump_to_csv, os.path.join(args.output_dir, "repository_data.csv")))
+    if args.format in ["json", "both"] and args.jsonl:
+        dumps.append((dump_to_jsonl, os.path.join(args.output_dir, "repository_data.jsonl")))
+    elif args.format in ["json", "both"]:
+        dumps.append((dump_to_json, os.path.join(args.output_dir, "repository_data.json")))
+    
     try:
-        if args.format in ["csv", "both"]:
-            csv_file = os.path.join(args.output_dir, "repository_data.csv")
-            dump_to_csv(csv_file)
-        
-        if args.format in ["json", "both"]:
-            json_file = os.path.join(args.output_dir, "repository_data.json")
-            dump_to_json(json_file)
+        # Each dump runs on its own pooled connection; both spend most of their
+        # time in libpq or the JSON encoder, so they overlap well in threads
+        with ThreadPoolExecutor(max_workers=len(dumps)) as executor:
+            futures = [executor.submit(dump, output_file) for dump, output_file in dumps]
+            for future in futures:
+                future.result()
         
         print("Database dump completed successfully!")
         
@@ -1,5 +1,13 @@
 #!/usr/bin/env python3
-"""Setup database schema"""
+"""
+Setup database schema
+
+Can be run repeatedly: tables are only created if missing and indexes are
+built with CREATE INDEX CONCURRENTLY, which does not block writes. Upgrading a
+database created by an older version adds columns to repositories and
+backfills them from the star history, which locks the table until it is done,
+so run that upgrade while no crawl is writing.
+"""
 import sys
 import os
 
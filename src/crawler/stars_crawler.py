@@ -1,27 +1,65 @@
 """Crawler for GitHub repository stars"""
+import asyncio
+import logging
+import random
 import time
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from src.config import Config
-from src.github.client import GitHubClient, RateLimitExceededError
-from src.github.rate_limiter import RateLimiter
-from src.database.connection import DatabaseConnection
+from src.github.client import AsyncGitHubClient, GitHubAPIError, RateLimitExceededError
 from src.database.repository import RepositoryStore
-from src.database.schema import Repository, RepositoryStar
+from src.database.schema import Repository, RepositoryRow, StarRow
+
+
+logger = logging.getLogger(__name__)
+
+# Use different search queries to get diverse repositories
+SEARCH_QUERIES = [
+    "stars:>0",  # Any repository with stars
+    "stars:>10",  # Repositories with more than 10 stars
+    "stars:>100",  # Repositories with more than 100 stars
+    "stars:>1000",  # Repositories with more than 1000 stars
+    "language:Python stars:>0",
+    "language:JavaScript stars:>0",
+    "language:Java stars:>0",
+    "language:Go stars:>0",
+    "language:Rust stars:>0",
+    "pushed:>2024-01-01 stars:>0",  # Recently active
+]
 
 
 class StarsCrawler:
-    """Crawls GitHub repositories and stores star counts"""
+    """
+    Crawls GitHub repositories and stores star counts.
+    
+    Each search query is paginated by its own task so that requests for
+    different queries overlap. Fetched pages are put on a queue drained by a
+    single writer task, which keeps database writes serialised and batched.
+    
+    The end cursor of each query is checkpointed with every stored batch, so
+    an interrupted crawl resumes from the last stored page instead of
+    starting over. A batch that cannot be stored ends the crawl, since the
+    fetchers have already paginated past it.
+    """
     
     def __init__(
         self,
-        github_client: GitHubClient,
+        github_client: AsyncGitHubClient,
         repository_store: RepositoryStore,
-        target_count: int = Config.TARGET_REPOSITORIES
+        target_count: int = Config.TARGET_REPOSITORIES,
+        search_queries: Optional[List[str]] = None
     ):
         self.github_client = github_client
         self.repository_store = repository_store
         self.target_count = target_count
+        self.search_queries = search_queries or SEARCH_QUERIES
         self.crawled_count = 0
+        # Repositories handed to the writer, including those not yet stored
+        self._queued_count = 0
+        # Resume cursor and stored repository count of each query
+        self._cursors: Dict[str, Optional[str]] = {}
+        self._query_counts: Dict[str, int] = {}
+        self._last_progress_log = 0.0
     
     def crawl(self) -> int:
         """
@@ -30,115 +68,246 @@ class StarsCrawler:
         Returns:
             Number of repositories crawled
         """
-        print(f"Starting crawl for {self.target_count:,} repositories...")
-        
-        # Use different search queries to get diverse repositories
-        search_queries = [
-            "stars:>0",  # Any repository with stars
-            "stars:>10",  # Repositories with more than 10 stars
-            "stars:>100",  # Repositories with more than 100 stars
-            "stars:>1000",  # Repositories with more than 1000 stars
-            "language:Python stars:>0",
-            "language:JavaScript stars:>0",
-            "language:Java stars:>0",
-            "language:Go stars:>0",
-            "language:Rust stars:>0",
-            "pushed:>2024-01-01 stars:>0",  # Recently active
-        ]
-        
-        query_index = 0
-        cursor = None
-        
-        while self.crawled_count < self.target_count:
+        logger.info("Starting crawl for %s repositories...", f"{self.target_count:,}")
+        
+        self._load_checkpoints()
+        
+        asyncio.run(self._crawl())
+        
+        if self.crawled_count >= self.target_count:
+            # Start the next crawl from the beginning
+            self.repository_store.clear_crawl_state()
+        
+        logger.info("Crawl completed! Total repositories crawled: %s", f"{self.crawled_count:,}")
+        return self.crawled_count
+    
+    def _load_checkpoints(self):
+        """Pick up the cursors and counts saved by an interrupted crawl"""
+        state = self.repository_store.load_crawl_state()
+        for query in self.search_queries:
+            if query in state:
+                self._cursors[query], self._query_counts[query] = state[query]
+        
+        self.crawled_count = sum(self._query_counts.values())
+        self._queued_count = self.crawled_count
+        
+        if self.crawled_count:
+            logger.info("Resuming crawl: %s repositories already stored", f"{self.crawled_count:,}")
+    
+    async def _crawl(self):
+        """Run one fetch task per search query alongside the writer task"""
+        # Bounded, so fetchers pause instead of buffering pages without limit
+        # when the database falls behind
+        queue: asyncio.Queue = asyncio.Queue(maxsize=Config.MAX_QUEUED_PAGES)
+        
+        async with self.github_client:
+            writer = asyncio.create_task(self._write_batches(queue))
+            fetchers = [
+                asyncio.create_task(self._crawl_query(query, queue))
+                for query in self.search_queries
+            ]
+            fetching = asyncio.gather(*fetchers, return_exceptions=True)
+            
+            # The writer only stops early when a batch could not be stored
+            await asyncio.wait({writer, fetching}, return_when=asyncio.FIRST_COMPLETED)
+            if writer.done():
+                fetching.cancel()
+                await asyncio.gather(fetching, return_exceptions=True)
+                await writer
+            
+            results = await fetching
+            for query, result in zip(self.search_queries, results):
+                if isinstance(result, Exception):
+                    logger.error("Giving up on query '%s': %s", query, result)
+            
+            # Signal the writer that no more pages are coming
+            await queue.put(None)
+            await writer
+    
+    async def _crawl_query(self, query: str, queue: asyncio.Queue):
+        """
+        Paginate through a single search query, queueing each page.
+        
+        Args:
+            query: Search query string
+            queue: Queue consumed by the writer task
+        """
+        cursor = self._cursors.get(query)
+        errors = 0
+        rate_limit_attempts = 0
+        
+        while self._queued_count < self.target_count:
+            batch_size = min(Config.BATCH_SIZE, self.target_count - self._queued_count)
+            
             try:
-                # Rotate through different search queries for diversity
-                query = search_queries[query_index % len(search_queries)]
-                
-                # Fetch batch of repositories
-                batch_size = min(Config.BATCH_SIZE, self.target_count - self.crawled_count)
-                
-                result = self.github_client.search_repositories(
+                result = await self.github_client.search_repositories(
                     query=query,
                     first=batch_size,
                     after=cursor
                 )
-                
-                search_data = result.get("search", {})
-                nodes = search_data.get("nodes", [])
-                page_info = search_data.get("pageInfo", {})
-                
-                if not nodes:
-                    # Try next query if current one returns no results
-                    query_index += 1
-                    cursor = None
-                    continue
-                
-                # Process and store repositories
-                repos, stars = self._process_repositories(nodes)
-                
-                if repos:
-                    self.repository_store.bulk_upsert_repositories(repos)
-                    self.repository_store.bulk_insert_star_counts(stars)
-                    
-                    self.crawled_count += len(repos)
-                    print(f"Crawled {self.crawled_count:,}/{self.target_count:,} repositories "
-                          f"(+{len(repos)} in this batch)")
-                
-                # Check if we should continue with this query
-                if page_info.get("hasNextPage"):
-                    cursor = page_info.get("endCursor")
-                else:
-                    # Move to next query
-                    query_index += 1
-                    cursor = None
-                
-                # Small delay to be respectful
-                time.sleep(0.1)
-                
+            
             except RateLimitExceededError as e:
-                print(f"Rate limit exceeded: {e}")
-                # Rate limiter should handle waiting, but add extra buffer
-                status = self.github_client.get_rate_limit_status()
-                print(f"Rate limit status: {status}")
-                time.sleep(60)  # Wait a minute before retrying
-                
-            except Exception as e:
-                print(f"Error during crawl: {e}")
-                # Continue with next query
-                query_index += 1
+                # Back off exponentially (with jitter), independently of other
+                # queries, but at least as long as GitHub asked for
+                delay = min(60, 2 ** rate_limit_attempts + random.uniform(0, 1))
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                rate_limit_attempts += 1
+                logger.warning("Rate limit exceeded: %s", e)
+                logger.warning("Rate limit status: %s", self.github_client.get_rate_limit_status())
+                await asyncio.sleep(delay)
+                continue
+            
+            except GitHubAPIError as e:
+                errors += 1
+                if errors >= Config.MAX_RETRIES:
+                    raise
+                logger.warning("Error during crawl of '%s': %s", query, e)
+                # Start this query over
                 cursor = None
-                time.sleep(1)
+                await asyncio.sleep(1)
+                continue
+            
+            errors = 0
+            rate_limit_attempts = 0
+            
+            search_data = result.get("search", {})
+            nodes = search_data.get("nodes", [])
+            page_info = search_data.get("pageInfo", {})
+            
+            if not nodes:
+                # Nothing (more) to fetch for this query
+                return
+            
+            # Process repositories and hand them to the writer
+            repos, stars = self._process_repositories(nodes)
+            
+            # Check if we should continue with this query
+            if page_info.get("hasNextPage"):
+                cursor = page_info.get("endCursor")
+            else:
+                # Wrap around to the first page
+                cursor = None
+            
+            if repos:
+                self._queued_count += len(repos)
+                await queue.put((query, cursor, repos, stars))
+    
+    async def _write_batches(self, queue: asyncio.Queue):
+        """
+        Store queued pages until the shutdown sentinel is received.
         
-        print(f"Crawl completed! Total repositories crawled: {self.crawled_count:,}")
-        return self.crawled_count
+        Pages are accumulated until WRITE_BATCH_SIZE repositories are pending,
+        then stored in a single transaction, so the database commits once per
+        batch rather than once per page.
+        
+        Args:
+            queue: Queue of (query, next_cursor, repository_rows, star_rows)
+                tuples, ended by None
+        """
+        repos: List[RepositoryRow] = []
+        stars: List[StarRow] = []
+        checkpoints: Dict[str, tuple] = {}
+        done = False
+        
+        while not done:
+            item = await queue.get()
+            if item is None:
+                done = True
+            else:
+                query, cursor, page_repos, page_stars = item
+                repos.extend(page_repos)
+                stars.extend(page_stars)
+                # Pages of a query arrive in order, so the last cursor wins
+                _, count = checkpoints.get(query, (None, 0))
+                checkpoints[query] = (cursor, count + len(page_repos))
+            
+            if repos and (done or len(repos) >= Config.WRITE_BATCH_SIZE):
+                await self._flush(repos, stars, checkpoints)
+                repos, stars, checkpoints = [], [], {}
     
-    def _process_repositories(self, nodes: List[dict]) -> tuple[List[Repository], List[RepositoryStar]]:
+    async def _flush(
+        self,
+        repos: List[RepositoryRow],
+        stars: List[StarRow],
+        checkpoints: Dict[str, tuple]
+    ):
+        """Store one batch and its checkpoints in a worker thread and update progress"""
+        # Concurrent fetchers may overshoot the target by a page or so
+        remaining = self.target_count - self.crawled_count
+        repos = repos[:remaining]
+        stars = stars[:remaining]
+        
+        if not repos:
+            return
+        
+        counts = {
+            query: self._query_counts.get(query, 0) + count
+            for query, (_, count) in checkpoints.items()
+        }
+        rows = [(query, cursor, counts[query]) for query, (cursor, _) in checkpoints.items()]
+        
+        try:
+            await asyncio.to_thread(self.repository_store.save_batch, repos, stars, rows)
+        except Exception as e:
+            # The fetchers' cursors are already past the lost pages, so later
+            # checkpoints would skip them; stop and resume from the saved ones
+            logger.error("Error storing batch, stopping crawl: %s", e)
+            raise
+        
+        self._query_counts.update(counts)
+        self.crawled_count += len(repos)
+        self._log_progress()
+    
+    def _log_progress(self):
+        """Log crawl progress, at most once per PROGRESS_LOG_INTERVAL seconds"""
+        now = time.monotonic()
+        if (now - self._last_progress_log < Config.PROGRESS_LOG_INTERVAL
+                and self.crawled_count < self.target_count):
+            return
+        
+        self._last_progress_log = now
+        logger.info("Crawled %s/%s repositories", f"{self.crawled_count:,}", f"{self.target_count:,}")
+    
+    def _process_repositories(self, nodes: List[dict]) -> tuple[List[RepositoryRow], List[StarRow]]:
         """
-        Process GitHub API response nodes into domain models.
+        Process GitHub API response nodes into table rows.
+        
+        Rows go straight to the database, so no Repository or RepositoryStar
+        objects are built on this path.
         
         Args:
             nodes: List of repository nodes from GraphQL response
             
         Returns:
-            Tuple of (repositories, star_counts)
+            Tuple of (repository_rows, star_rows)
         """
+        # All repositories on a page were fetched at the same moment
+        crawled_at = datetime.utcnow()
+        
+        try:
+            repos = Repository.batch_rows_from_github(nodes)
+        except Exception:
+            # Fall back to converting node by node to skip the malformed ones
+            pass
+        else:
+            stars = [
+                (repo[0], node.get("stargazerCount", 0), crawled_at)
+                for repo, node in zip(repos, nodes)
+            ]
+            return repos, stars
+        
         repos = []
         stars = []
         
         for node in nodes:
             try:
-                # Create repository model
-                repo = Repository.from_github_data(node)
-                repos.append(repo)
-                
-                # Create star count model
-                star_count = node.get("stargazerCount", 0)
-                star = RepositoryStar.from_github_data(repo.id, star_count)
-                stars.append(star)
-                
+                repo = Repository.row_from_github_data(node)
             except Exception as e:
-                print(f"Error processing repository node: {e}")
+                logger.warning("Error processing repository node: %s", e)
                 continue
+            
+            repos.append(repo)
+            stars.append((repo[0], node.get("stargazerCount", 0), crawled_at))
         
         return repos, stars
-
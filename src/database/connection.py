@@ -1,40 +1,111 @@
 """Database connection management"""
-import psycopg2
+import threading
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
-from typing import Optional
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+from typing import Dict, Optional
 from contextlib import contextmanager
 from src.config import Config
 
 
+class PersistentConnectionPool(ThreadedConnectionPool):
+    """
+    Thread-safe pool that keeps returned connections open for reuse.
+    
+    ThreadedConnectionPool closes a returned connection whenever minconn
+    connections are already idle, so under bursty load most checkouts above
+    minconn pay for a new connection. This pool keeps up to maxconn idle
+    connections instead, for the lifetime of the process. putconn is
+    implemented here in full rather than by adjusting minconn around the
+    base implementation.
+    """
+    
+    def putconn(self, conn=None, key=None, close=False):
+        """Put away an unused connection, keeping it open while fewer than maxconn are idle"""
+        with self._lock:
+            if self.closed:
+                raise PoolError("connection pool is closed")
+            
+            if key is None:
+                key = self._rused.get(id(conn))
+                if key is None:
+                    raise PoolError("trying to put unkeyed connection")
+            
+            if len(self._pool) < self.maxconn and not close and not conn.closed:
+                # Return the connection to a consistent state before reuse
+                status = conn.info.transaction_status
+                if status == TRANSACTION_STATUS_UNKNOWN:
+                    # Server connection lost
+                    conn.close()
+                else:
+                    if status != TRANSACTION_STATUS_IDLE:
+                        # In a transaction or in error
+                        conn.rollback()
+                    self._pool.append(conn)
+            else:
+                conn.close()
+            
+            del self._used[key]
+            del self._rused[id(conn)]
+
+
+# Connection pools are shared process-wide, keyed by connection string, so the
+# crawler and the scripts reuse the same connections
+_pools: Dict[str, PersistentConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(connection_string: str) -> PersistentConnectionPool:
+    """Return the shared pool for a connection string, creating it if needed"""
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None or pool.closed:
+            pool = PersistentConnectionPool(
+                minconn=Config.DB_POOL_MIN_CONNECTIONS,
+                maxconn=Config.DB_POOL_MAX_CONNECTIONS,
+                dsn=connection_string
+            )
+            _pools[connection_string] = pool
+        return pool
+
+
 class DatabaseConnection:
     """Manages PostgreSQL database connections"""
     
     def __init__(self, connection_string: Optional[str] = None):
         self.connection_string = connection_string or Config.DATABASE_URL
+        self._pool = _get_pool(self.connection_string)
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = None
+        """Context manager for database connections checked out from the pool"""
+        conn = self._pool.getconn()
         try:
-            conn = psycopg2.connect(self.connection_string)
             yield conn
             conn.commit()
         except Exception as e:
-            if conn:
+            if not conn.closed:
                 conn.rollback()
             raise e
         finally:
-            if conn:
-                conn.close()
+            # Broken connections are discarded rather than handed out again
+            self._pool.putconn(conn, close=bool(conn.closed))
     
     @contextmanager
-    def get_cursor(self):
-        """Context manager for database cursors"""
+    def get_cursor(self, name: Optional[str] = None, itersize: int = 2000):
+        """
+        Context manager for database cursors.
+        
+        Args:
+            name: If given, open a server-side (named) cursor so that iterating
+                over a large result fetches it in chunks instead of all at once
+            itersize: Rows fetched per round trip when iterating a named cursor
+        """
         with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(name=name, cursor_factory=RealDictCursor)
+            if name:
+                cursor.itersize = itersize
             try:
                 yield cursor
             finally:
                 cursor.close()
-
@@ -14,10 +14,13 @@ class SchemaMigration:
             cursor = conn.cursor()
             
             try:
-                # Create repositories table
+                # Create repositories table. GitHub node IDs are opaque ASCII
+                # tokens, so ID columns here and in referencing tables use the
+                # "C" collation: key comparisons are plain byte comparisons
+                # instead of locale-aware ones
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS repositories (
-                        id VARCHAR(255) PRIMARY KEY,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
                         name VARCHAR(255) NOT NULL,
                         owner VARCHAR(255) NOT NULL,
                         full_name VARCHAR(512) NOT NULL UNIQUE,
@@ -30,41 +33,60 @@ class SchemaMigration:
                         is_private BOOLEAN DEFAULT FALSE,
                         is_fork BOOLEAN DEFAULT FALSE,
                         is_archived BOOLEAN DEFAULT FALSE,
+                        latest_star_count INTEGER,
+                        latest_crawled_at TIMESTAMP,
                         created_at_db TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         updated_at_db TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
                 
+                # Latest star count columns for databases created before they
+                # existed. Checked first, because ALTER TABLE takes an ACCESS
+                # EXCLUSIVE lock even when there is nothing to add
+                cursor.execute("""
+                    SELECT count(*) FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                      AND table_name = 'repositories'
+                      AND column_name IN ('latest_star_count', 'latest_crawled_at')
+                """)
+                add_latest_columns = cursor.fetchone()[0] < 2
+                if add_latest_columns:
+                    cursor.execute("""
+                        ALTER TABLE repositories
+                            ADD COLUMN IF NOT EXISTS latest_star_count INTEGER,
+                            ADD COLUMN IF NOT EXISTS latest_crawled_at TIMESTAMP
+                    """)
+                
                 # Create repository_stars table for historical tracking
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS repository_stars (
                         id SERIAL PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
                         star_count INTEGER NOT NULL,
                         crawled_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                         UNIQUE(repository_id, crawled_at)
                     )
                 """)
                 
-                # Create indexes for efficient queries
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_repositories_full_name 
-                    ON repositories(full_name)
-                """)
-                
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_repositories_owner 
-                    ON repositories(owner)
-                """)
-                
+                # Unlogged staging table that star counts are bulk-copied into
+                # before being merged into repository_stars (skips WAL for the load)
                 cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_repository_stars_repo_id 
-                    ON repository_stars(repository_id)
+                    CREATE UNLOGGED TABLE IF NOT EXISTS repository_stars_stage (
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL,
+                        star_count INTEGER NOT NULL,
+                        crawled_at TIMESTAMP NOT NULL
+                    )
                 """)
                 
+                # Per-query pagination checkpoints, so an interrupted crawl can
+                # resume where it stopped
                 cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_repository_stars_crawled_at 
-                    ON repository_stars(crawled_at DESC)
+                    CREATE TABLE IF NOT EXISTS crawl_state (
+                        query TEXT COLLATE "C" PRIMARY KEY,
+                        end_cursor TEXT,
+                        crawled_count INTEGER NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
                 """)
                 
                 # Create a view for latest star counts (efficient for queries)
@@ -78,14 +100,62 @@ class SchemaMigration:
                     ORDER BY repository_id, crawled_at DESC
                 """)
                 
+                # Backfill the columns just added from existing history. Runs
+                # once: writers keep them up to date from then on
+                if add_latest_columns:
+                    cursor.execute("""
+                        UPDATE repositories r
+                        SET latest_star_count = lrs.star_count,
+                            latest_crawled_at = lrs.crawled_at
+                        FROM latest_repository_stars lrs
+                        WHERE r.id = lrs.repository_id
+                          AND r.latest_crawled_at IS NULL
+                    """)
+                
                 conn.commit()
-                print("Database schema created successfully")
                 
             except Exception as e:
                 conn.rollback()
                 raise e
             finally:
                 cursor.close()
+        
+        self._create_indexes()
+        print("Database schema created successfully")
+    
+    def _create_indexes(self):
+        """
+        Create indexes without blocking writers.
+        
+        CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block,
+        so these statements run in autocommit mode. Index builds therefore do
+        not block writes to a live database. The UNIQUE constraints on
+        repositories(full_name) and repository_stars(repository_id, crawled_at)
+        already provide indexes for lookups by full name and by repository,
+        so no separate indexes are kept for those.
+        """
+        with self.db.get_connection() as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            
+            try:
+                # Redundant with the indexes behind the UNIQUE constraints
+                cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_repositories_full_name")
+                cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_repository_stars_repo_id")
+                
+                cursor.execute("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_repositories_owner 
+                    ON repositories(owner)
+                """)
+                
+                cursor.execute("""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_repository_stars_crawled_at 
+                    ON repository_stars(crawled_at DESC)
+                """)
+            finally:
+                cursor.close()
+                # Connections are pooled; hand it back in its default mode
+                conn.autocommit = False
     
     def create_future_schema_tables(self):
         """
@@ -105,8 +175,8 @@ class SchemaMigration:
                 # Issues table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS issues (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
                         number INTEGER NOT NULL,
                         title TEXT NOT NULL,
                         body TEXT,
@@ -124,8 +194,8 @@ class SchemaMigration:
                 # Pull requests table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS pull_requests (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
                         number INTEGER NOT NULL,
                         title TEXT NOT NULL,
                         body TEXT,
@@ -143,10 +213,10 @@ class SchemaMigration:
                 # Comments table (for both issues and PRs)
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS comments (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
-                        issue_id VARCHAR(255) REFERENCES issues(id) ON DELETE CASCADE,
-                        pull_request_id VARCHAR(255) REFERENCES pull_requests(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        issue_id VARCHAR(255) COLLATE "C" REFERENCES issues(id) ON DELETE CASCADE,
+                        pull_request_id VARCHAR(255) COLLATE "C" REFERENCES pull_requests(id) ON DELETE CASCADE,
                         body TEXT NOT NULL,
                         author VARCHAR(255),
                         created_at TIMESTAMP,
@@ -159,9 +229,9 @@ class SchemaMigration:
                 # Commits table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS commits (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
-                        pull_request_id VARCHAR(255) REFERENCES pull_requests(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        pull_request_id VARCHAR(255) COLLATE "C" REFERENCES pull_requests(id) ON DELETE CASCADE,
                         message TEXT NOT NULL,
                         author VARCHAR(255),
                         committed_at TIMESTAMP,
@@ -172,9 +242,9 @@ class SchemaMigration:
                 # Reviews table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS reviews (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
-                        pull_request_id VARCHAR(255) NOT NULL REFERENCES pull_requests(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        pull_request_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES pull_requests(id) ON DELETE CASCADE,
                         state VARCHAR(50) NOT NULL,
                         author VARCHAR(255),
                         body TEXT,
@@ -186,9 +256,9 @@ class SchemaMigration:
                 # CI checks table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS ci_checks (
-                        id VARCHAR(255) PRIMARY KEY,
-                        repository_id VARCHAR(255) NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
-                        pull_request_id VARCHAR(255) REFERENCES pull_requests(id) ON DELETE CASCADE,
+                        id VARCHAR(255) COLLATE "C" PRIMARY KEY,
+                        repository_id VARCHAR(255) COLLATE "C" NOT NULL REFERENCES repositories(id) ON DELETE CASCADE,
+                        pull_request_id VARCHAR(255) COLLATE "C" REFERENCES pull_requests(id) ON DELETE CASCADE,
                         name VARCHAR(255) NOT NULL,
                         status VARCHAR(50) NOT NULL,
                         conclusion VARCHAR(50),
@@ -1,7 +1,225 @@
 """Database repository for storing crawled data"""
-from typing import List, Optional
+import io
+import struct
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from psycopg2.extras import execute_values
+from src.config import Config
 from src.database.connection import DatabaseConnection
-from src.database.schema import Repository, RepositoryStar
+from src.database.schema import Repository, RepositoryStar, RepositoryRow, StarRow
+
+
+# PostgreSQL binary COPY framing: signature, flags, header extension length
+_PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_PGCOPY_TRAILER = struct.pack("!h", -1)
+_PGCOPY_NULL = struct.pack("!i", -1)
+_PG_EPOCH = datetime(2000, 1, 1)
+
+
+def _pg_timestamp(value: datetime) -> int:
+    """Convert a datetime to microseconds since the PostgreSQL epoch (UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _PG_EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _star_rows_to_pgcopy(rows: List[StarRow]) -> io.BytesIO:
+    """
+    Encode star count rows in PostgreSQL's binary COPY format.
+    
+    Each tuple is (repository_id VARCHAR, star_count INTEGER, crawled_at TIMESTAMP).
+    """
+    buf = io.BytesIO()
+    buf.write(_PGCOPY_HEADER)
+    for repository_id, star_count, crawled_at in rows:
+        repository_id = repository_id.encode("utf-8")
+        buf.write(struct.pack("!hi", 3, len(repository_id)))
+        buf.write(repository_id)
+        buf.write(struct.pack("!iiiq", 4, star_count, 8, _pg_timestamp(crawled_at)))
+    buf.write(_PGCOPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def _repository_rows_to_pgcopy(rows: List[RepositoryRow]) -> io.BytesIO:
+    """
+    Encode repository rows in PostgreSQL's binary COPY format.
+    
+    Values are VARCHAR/TEXT, TIMESTAMP or BOOLEAN columns, in Repository
+    field order; None is written as NULL.
+    """
+    buf = io.BytesIO()
+    buf.write(_PGCOPY_HEADER)
+    for row in rows:
+        buf.write(struct.pack("!h", len(row)))
+        for value in row:
+            if value is None:
+                buf.write(_PGCOPY_NULL)
+            elif isinstance(value, bool):
+                buf.write(struct.pack("!i?", 1, value))
+            elif isinstance(value, datetime):
+                buf.write(struct.pack("!iq", 8, _pg_timestamp(value)))
+            else:
+                value = value.encode("utf-8")
+                buf.write(struct.pack("!i", len(value)))
+                buf.write(value)
+    buf.write(_PGCOPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+# Repository columns in field order, and the update applied to existing rows
+_REPOSITORY_COLUMNS = """
+        id, name, owner, full_name, description, url,
+        created_at, updated_at, pushed_at, language,
+        is_private, is_fork, is_archived
+"""
+_REPOSITORY_CONFLICT_SQL = """
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name,
+        owner = EXCLUDED.owner,
+        full_name = EXCLUDED.full_name,
+        description = EXCLUDED.description,
+        url = EXCLUDED.url,
+        updated_at = EXCLUDED.updated_at,
+        pushed_at = EXCLUDED.pushed_at,
+        language = EXCLUDED.language,
+        is_private = EXCLUDED.is_private,
+        is_fork = EXCLUDED.is_fork,
+        is_archived = EXCLUDED.is_archived,
+        updated_at_db = CURRENT_TIMESTAMP
+"""
+
+# Bulk upsert for rows in Repository field order; execute_values expands the
+# VALUES placeholder into one multi-row list per page
+_UPSERT_REPOSITORIES_SQL = f"""
+    INSERT INTO repositories ({_REPOSITORY_COLUMNS}) VALUES %s
+    {_REPOSITORY_CONFLICT_SQL}
+"""
+_REPOSITORY_ROW_TEMPLATE = "(" + ", ".join(["%s"] * 13) + ")"
+
+# Merges the staged star counts and empties the staging table. The statements
+# are sent as one query string, so they cost a single round trip
+_MERGE_STAR_STAGE_SQL = """
+    INSERT INTO repository_stars (repository_id, star_count, crawled_at)
+    SELECT repository_id, star_count, crawled_at
+    FROM repository_stars_stage
+    ON CONFLICT (repository_id, crawled_at) DO NOTHING;
+    
+    UPDATE repositories r
+    SET latest_star_count = s.star_count,
+        latest_crawled_at = s.crawled_at
+    FROM (
+        SELECT DISTINCT ON (repository_id) repository_id, star_count, crawled_at
+        FROM repository_stars_stage
+        ORDER BY repository_id, crawled_at DESC
+    ) s
+    WHERE r.id = s.repository_id
+      AND (r.latest_crawled_at IS NULL OR r.latest_crawled_at <= s.crawled_at);
+    
+    TRUNCATE repository_stars_stage;
+"""
+
+# Inserts star counts passed as one array per column and updates the latest
+# star count columns from them, in a single statement
+_INSERT_STAR_ARRAYS_SQL = """
+    WITH s AS (
+        SELECT *
+        FROM unnest(%s::text[], %s::integer[], %s::timestamp[])
+            AS s (repository_id, star_count, crawled_at)
+    ), inserted AS (
+        INSERT INTO repository_stars (repository_id, star_count, crawled_at)
+        SELECT repository_id, star_count, crawled_at FROM s
+        ON CONFLICT (repository_id, crawled_at) DO NOTHING
+    )
+    UPDATE repositories r
+    SET latest_star_count = l.star_count,
+        latest_crawled_at = l.crawled_at
+    FROM (
+        SELECT DISTINCT ON (repository_id) repository_id, star_count, crawled_at
+        FROM s
+        ORDER BY repository_id, crawled_at DESC
+    ) l
+    WHERE r.id = l.repository_id
+      AND (r.latest_crawled_at IS NULL OR r.latest_crawled_at <= l.crawled_at)
+"""
+
+# Single-row write statements, run as server-side prepared statements with
+# positional $n parameters (their types are inferred from the target columns)
+_UPSERT_REPOSITORY_SQL = f"""
+    INSERT INTO repositories ({_REPOSITORY_COLUMNS})
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+    {_REPOSITORY_CONFLICT_SQL}
+"""
+_INSERT_STAR_COUNT_SQL = """
+    INSERT INTO repository_stars (repository_id, star_count, crawled_at)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (repository_id, crawled_at) DO NOTHING
+"""
+_UPDATE_LATEST_STAR_COUNT_SQL = """
+    UPDATE repositories
+    SET latest_star_count = $2,
+        latest_crawled_at = $3
+    WHERE id = $1
+      AND (latest_crawled_at IS NULL OR latest_crawled_at <= $3)
+"""
+
+
+class _PreparedStatementCache:
+    """Least-recently-used map of SQL text to prepared statement name for one session"""
+    
+    def __init__(self, backend_pid: int, max_size: int):
+        self.backend_pid = backend_pid
+        self.max_size = max_size
+        self._names: "OrderedDict[str, str]" = OrderedDict()
+        self._counter = 0
+    
+    def get(self, sql: str) -> Optional[str]:
+        """Return the statement name for sql, if it is prepared"""
+        name = self._names.get(sql)
+        if name is not None:
+            self._names.move_to_end(sql)
+        return name
+    
+    def new_name(self) -> str:
+        """Return an unused statement name"""
+        self._counter += 1
+        return f"stmt_{self._counter}"
+    
+    def add(self, sql: str, name: str) -> List[str]:
+        """Record a prepared statement and return the names evicted to make room"""
+        self._names[sql] = name
+        evicted = []
+        while len(self._names) > self.max_size:
+            evicted.append(self._names.popitem(last=False)[1])
+        return evicted
+
+
+# Prepared statement cache of each pooled connection. Connections come from a
+# process-wide pool and outlive any one RepositoryStore, so the statements
+# they hold are tracked here rather than per store
+_prepared_statements: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_prepared_statements_lock = threading.Lock()
+
+
+def _prepared_statement_cache(conn) -> _PreparedStatementCache:
+    """Return the prepared statement cache of conn's current server session"""
+    backend_pid = conn.get_backend_pid()
+    with _prepared_statements_lock:
+        cache = _prepared_statements.get(conn)
+        if cache is None or cache.backend_pid != backend_pid:
+            cache = _PreparedStatementCache(backend_pid, Config.PREPARED_STATEMENT_CACHE_SIZE)
+            _prepared_statements[conn] = cache
+    return cache
+
+
+# Crawl checkpoints as (query, end_cursor, crawled_count) rows
+CrawlCheckpoint = Tuple[str, Optional[str], int]
 
 
 class RepositoryStore:
@@ -10,138 +228,211 @@ class RepositoryStore:
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
     
+    def _execute_prepared(self, cursor, sql: str, params: tuple):
+        """
+        Run a statement with $n parameters as a server-side prepared statement.
+        
+        A statement is prepared the first time its SQL text is used on a
+        connection, so Postgres parses and plans it once per session instead
+        of once per call. Each connection keeps the PREPARED_STATEMENT_CACHE_SIZE
+        most recently used statements; older ones are deallocated. Prepared
+        statements belong to the server session, so the backend PID is
+        recorded with them: a connection that was reset starts over with a
+        new session and an empty cache. The cache lives with the connection,
+        not the store, so every store sharing the pool sees the statements
+        already prepared on it. Postgres replans prepared statements itself
+        when the tables they use are altered.
+        """
+        cache = _prepared_statement_cache(cursor.connection)
+        
+        name = cache.get(sql)
+        if name is None:
+            name = cache.new_name()
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            for evicted in cache.add(sql, name):
+                cursor.execute(f"DEALLOCATE {evicted}")
+        
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    
     def upsert_repository(self, repo: Repository):
         """Insert or update repository information"""
         with self.db.get_cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO repositories (
-                    id, name, owner, full_name, description, url,
-                    created_at, updated_at, pushed_at, language,
-                    is_private, is_fork, is_archived
-                ) VALUES (
-                    %(id)s, %(name)s, %(owner)s, %(full_name)s, %(description)s, %(url)s,
-                    %(created_at)s, %(updated_at)s, %(pushed_at)s, %(language)s,
-                    %(is_private)s, %(is_fork)s, %(is_archived)s
-                )
-                ON CONFLICT (id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    owner = EXCLUDED.owner,
-                    full_name = EXCLUDED.full_name,
-                    description = EXCLUDED.description,
-                    url = EXCLUDED.url,
-                    updated_at = EXCLUDED.updated_at,
-                    pushed_at = EXCLUDED.pushed_at,
-                    language = EXCLUDED.language,
-                    is_private = EXCLUDED.is_private,
-                    is_fork = EXCLUDED.is_fork,
-                    is_archived = EXCLUDED.is_archived,
-                    updated_at_db = CURRENT_TIMESTAMP
-            """, {
-                "id": repo.id,
-                "name": repo.name,
-                "owner": repo.owner,
-                "full_name": repo.full_name,
-                "description": repo.description,
-                "url": repo.url,
-                "created_at": repo.created_at,
-                "updated_at": repo.updated_at,
-                "pushed_at": repo.pushed_at,
-                "language": repo.language,
-                "is_private": repo.is_private,
-                "is_fork": repo.is_fork,
-                "is_archived": repo.is_archived,
-            })
+            self._execute_prepared(cursor, _UPSERT_REPOSITORY_SQL, repo)
     
     def insert_star_count(self, star: RepositoryStar):
         """Insert star count (allows historical tracking)"""
         with self.db.get_cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO repository_stars (repository_id, star_count, crawled_at)
-                VALUES (%(repository_id)s, %(star_count)s, %(crawled_at)s)
-                ON CONFLICT (repository_id, crawled_at) DO NOTHING
-            """, {
-                "repository_id": star.repository_id,
-                "star_count": star.star_count,
-                "crawled_at": star.crawled_at,
-            })
-    
-    def bulk_upsert_repositories(self, repos: List[Repository]):
-        """Bulk insert/update repositories for efficiency"""
-        if not repos:
+            self._execute_prepared(cursor, _INSERT_STAR_COUNT_SQL, star)
+            self._execute_prepared(cursor, _UPDATE_LATEST_STAR_COUNT_SQL, star)
+    
+    @contextmanager
+    def _use_connection(self, conn=None):
+        """
+        Yield the given connection, or check out a new one.
+        
+        When a connection is passed in, the caller owns the transaction and is
+        responsible for committing it.
+        """
+        if conn is not None:
+            yield conn
             return
         
         with self.db.get_connection() as conn:
+            yield conn
+    
+    def save_batch(
+        self,
+        repository_rows: List[RepositoryRow],
+        star_rows: List[StarRow],
+        checkpoints: Optional[List[CrawlCheckpoint]] = None
+    ):
+        """
+        Store repository rows and their star count rows in a single transaction.
+        
+        Crawl checkpoints for the pages in the batch are written in the same
+        transaction, so a saved cursor never points past data that was lost.
+        """
+        with self.db.get_connection() as conn:
+            self.bulk_upsert_repository_rows(repository_rows, conn=conn)
+            self.bulk_insert_star_rows(star_rows, conn=conn)
+            if checkpoints:
+                self.save_crawl_state(checkpoints, conn=conn)
+    
+    def save_crawl_state(self, checkpoints: List[CrawlCheckpoint], conn=None):
+        """Insert or update the pagination checkpoint of each search query"""
+        with self._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            try:
+                execute_values(cursor, """
+                    INSERT INTO crawl_state (query, end_cursor, crawled_count)
+                    VALUES %s
+                    ON CONFLICT (query) DO UPDATE SET
+                        end_cursor = EXCLUDED.end_cursor,
+                        crawled_count = EXCLUDED.crawled_count,
+                        updated_at = CURRENT_TIMESTAMP
+                """, checkpoints)
+            finally:
+                cursor.close()
+    
+    def load_crawl_state(self) -> Dict[str, Tuple[Optional[str], int]]:
+        """
+        Load saved pagination checkpoints.
+        
+        Returns:
+            Mapping of search query to (end_cursor, crawled_count)
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT query, end_cursor, crawled_count FROM crawl_state")
+            return {
+                row["query"]: (row["end_cursor"], row["crawled_count"])
+                for row in cursor.fetchall()
+            }
+    
+    def clear_crawl_state(self):
+        """Forget saved checkpoints once a crawl has completed"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM crawl_state")
+    
+    def bulk_upsert_repositories(self, repos: List[Repository], conn=None):
+        """Bulk insert/update repositories for efficiency"""
+        # Repositories are tuples in column order already
+        self.bulk_upsert_repository_rows(repos, conn=conn)
+    
+    def bulk_upsert_repository_rows(self, rows: List[RepositoryRow], conn=None):
+        """Bulk insert/update repositories given as rows in Repository field order"""
+        if not rows:
+            return
+        
+        # A single INSERT ... ON CONFLICT DO UPDATE may not touch a row twice,
+        # so keep only the latest copy of each repository
+        rows = list({row[0]: row for row in rows}.values())
+        
+        if len(rows) >= Config.COPY_UPSERT_THRESHOLD:
+            self._copy_upsert_repository_rows(rows, conn=conn)
+            return
+        
+        with self._use_connection(conn) as conn:
+            cursor = conn.cursor()
+            try:
+                # Ship the rows as multi-row VALUES statements
+                execute_values(
+                    cursor, _UPSERT_REPOSITORIES_SQL, rows,
+                    template=_REPOSITORY_ROW_TEMPLATE, page_size=Config.UPSERT_PAGE_SIZE
+                )
+            finally:
+                cursor.close()
+    
+    def _copy_upsert_repository_rows(self, rows: List[RepositoryRow], conn=None):
+        """
+        Upsert a large batch of deduplicated repository rows through COPY.
+        
+        The rows are bulk-loaded into a temporary table with a binary COPY and
+        merged into repositories with one INSERT ... SELECT ... ON CONFLICT.
+        The temporary table is dropped right after the merge, so a caller can
+        run several large upserts in one transaction on the same connection.
+        """
+        with self._use_connection(conn) as conn:
             cursor = conn.cursor()
             try:
-                # Use executemany for bulk operations
-                cursor.executemany("""
-                    INSERT INTO repositories (
-                        id, name, owner, full_name, description, url,
-                        created_at, updated_at, pushed_at, language,
-                        is_private, is_fork, is_archived
-                    ) VALUES (
-                        %(id)s, %(name)s, %(owner)s, %(full_name)s, %(description)s, %(url)s,
-                        %(created_at)s, %(updated_at)s, %(pushed_at)s, %(language)s,
-                        %(is_private)s, %(is_fork)s, %(is_archived)s
-                    )
-                    ON CONFLICT (id) DO UPDATE SET
-                        name = EXCLUDED.name,
-                        owner = EXCLUDED.owner,
-                        full_name = EXCLUDED.full_name,
-                        description = EXCLUDED.description,
-                        url = EXCLUDED.url,
-                        updated_at = EXCLUDED.updated_at,
-                        pushed_at = EXCLUDED.pushed_at,
-                        language = EXCLUDED.language,
-                        is_private = EXCLUDED.is_private,
-                        is_fork = EXCLUDED.is_fork,
-                        is_archived = EXCLUDED.is_archived,
-                        updated_at_db = CURRENT_TIMESTAMP
-                """, [{
-                    "id": repo.id,
-                    "name": repo.name,
-                    "owner": repo.owner,
-                    "full_name": repo.full_name,
-                    "description": repo.description,
-                    "url": repo.url,
-                    "created_at": repo.created_at,
-                    "updated_at": repo.updated_at,
-                    "pushed_at": repo.pushed_at,
-                    "language": repo.language,
-                    "is_private": repo.is_private,
-                    "is_fork": repo.is_fork,
-                    "is_archived": repo.is_archived,
-                } for repo in repos])
-                
-                conn.commit()
-            except Exception as e:
-                conn.rollback()
-                raise e
+                cursor.execute("""
+                    CREATE TEMP TABLE repositories_stage
+                    (LIKE repositories INCLUDING DEFAULTS)
+                """)
+                cursor.copy_expert(f"""
+                    COPY repositories_stage ({_REPOSITORY_COLUMNS})
+                    FROM STDIN WITH (FORMAT binary)
+                """, _repository_rows_to_pgcopy(rows))
+                cursor.execute(f"""
+                    INSERT INTO repositories ({_REPOSITORY_COLUMNS})
+                    SELECT {_REPOSITORY_COLUMNS} FROM repositories_stage
+                    {_REPOSITORY_CONFLICT_SQL};
+                    
+                    DROP TABLE repositories_stage
+                """)
             finally:
                 cursor.close()
     
-    def bulk_insert_star_counts(self, stars: List[RepositoryStar]):
+    def bulk_insert_star_counts(self, stars: List[RepositoryStar], conn=None):
         """Bulk insert star counts for efficiency"""
-        if not stars:
+        # Star counts are tuples in column order already
+        self.bulk_insert_star_rows(stars, conn=conn)
+    
+    def bulk_insert_star_rows(self, rows: List[StarRow], conn=None):
+        """
+        Bulk insert star count rows in RepositoryStar field order.
+        
+        Batches below COPY_UPSERT_THRESHOLD rows are sent as one array per
+        column, which Postgres unnests into rows; the insert and the update of
+        the latest star count columns happen in a single statement.
+        
+        Larger batches are loaded into the unlogged repository_stars_stage
+        table with a binary COPY and merged into repository_stars with one
+        INSERT ... SELECT, the latest star count columns being updated from
+        the same staged rows. Locking, loading and merging take three round
+        trips regardless of the number of rows.
+        """
+        if not rows:
             return
         
-        with self.db.get_connection() as conn:
+        if len(rows) < Config.COPY_UPSERT_THRESHOLD:
+            with self._use_connection(conn) as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(_INSERT_STAR_ARRAYS_SQL, [list(column) for column in zip(*rows)])
+                finally:
+                    cursor.close()
+            return
+        
+        with self._use_connection(conn) as conn:
             cursor = conn.cursor()
             try:
-                cursor.executemany("""
-                    INSERT INTO repository_stars (repository_id, star_count, crawled_at)
-                    VALUES (%(repository_id)s, %(star_count)s, %(crawled_at)s)
-                    ON CONFLICT (repository_id, crawled_at) DO NOTHING
-                """, [{
-                    "repository_id": star.repository_id,
-                    "star_count": star.star_count,
-                    "crawled_at": star.crawled_at,
-                } for star in stars])
-                
-                conn.commit()
-            except Exception as e:
-                conn.rollback()
-                raise e
+                # The staging table is shared; hold it for the whole transaction
+                cursor.execute("LOCK TABLE repository_stars_stage IN ACCESS EXCLUSIVE MODE")
+                cursor.copy_expert("""
+                    COPY repository_stars_stage (repository_id, star_count, crawled_at)
+                    FROM STDIN WITH (FORMAT binary)
+                """, _star_rows_to_pgcopy(rows))
+                cursor.execute(_MERGE_STAR_STAGE_SQL)
             finally:
                 cursor.close()
     
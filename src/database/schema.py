@@ -1,12 +1,55 @@
 """Database schema definitions"""
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import List, NamedTuple, Optional, Tuple
 
+try:
+    from ciso8601 import parse_datetime as _parse_iso8601
+except ImportError:  # Fall back to the (slower) stdlib parser
+    _parse_iso8601 = None
 
-@dataclass(frozen=True)
-class Repository:
-    """Immutable repository data model"""
+
+# Plain table rows, for paths that go straight from API data to the database:
+# a RepositoryRow follows Repository's field order, a StarRow RepositoryStar's.
+# Model instances are tuples in that order too, so they are valid rows
+RepositoryRow = Tuple
+StarRow = Tuple[str, int, datetime]
+
+# Fields of a GitHub repository node in Repository field order, fetched in one call
+_NODE_FIELDS = itemgetter(
+    "id", "name", "owner", "nameWithOwner", "description", "url",
+    "createdAt", "updatedAt", "pushedAt", "primaryLanguage",
+    "isPrivate", "isFork", "isArchived",
+)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an ISO 8601 timestamp from the GitHub API into a naive UTC datetime.
+    
+    The columns are TIMESTAMP (without time zone). Passing aware datetimes
+    would let Postgres shift them into the session TimeZone on some write
+    paths but not on the binary COPY path, so they are normalised here once.
+    """
+    if not value:
+        return None
+    if _parse_iso8601 is not None:
+        parsed = _parse_iso8601(value)
+    else:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class Repository(NamedTuple):
+    """
+    Immutable repository data model.
+    
+    A NamedTuple rather than a dataclass: instances are built by the C tuple
+    constructor and are tuples in column order, so they can be written to
+    the database as they are.
+    """
     id: str
     name: str
     owner: str
@@ -24,25 +67,56 @@ class Repository:
     @classmethod
     def from_github_data(cls, data: dict) -> "Repository":
         """Create Repository from GitHub API response"""
-        return cls(
-            id=str(data["id"]),
-            name=data["name"],
-            owner=data["owner"]["login"],
-            full_name=data["nameWithOwner"],
-            description=data.get("description"),
-            url=data["url"],
-            created_at=datetime.fromisoformat(data["createdAt"].replace("Z", "+00:00")) if data.get("createdAt") else None,
-            updated_at=datetime.fromisoformat(data["updatedAt"].replace("Z", "+00:00")) if data.get("updatedAt") else None,
-            pushed_at=datetime.fromisoformat(data["pushedAt"].replace("Z", "+00:00")) if data.get("pushedAt") else None,
-            language=data.get("primaryLanguage", {}).get("name") if data.get("primaryLanguage") else None,
-            is_private=data.get("isPrivate", False),
-            is_fork=data.get("isFork", False),
-            is_archived=data.get("isArchived", False),
-        )
+        return cls(*cls.row_from_github_data(data))
+    
+    @staticmethod
+    def row_from_github_data(data: dict) -> RepositoryRow:
+        """
+        Convert a GitHub API response node straight into a table row.
+        
+        The tuple follows the field order of Repository, which is also the
+        column order RepositoryStore writes, so nodes can be stored without
+        building a Repository for each one. The node must contain every field
+        selected by the repository search queries (GraphQL returns null for
+        absent values, so the keys are always present); a missing key raises
+        KeyError.
+        """
+        return Repository.batch_rows_from_github([data])[0]
+    
+    @staticmethod
+    def batch_rows_from_github(nodes: List[dict]) -> List[RepositoryRow]:
+        """
+        Convert a page of GitHub API response nodes into table rows.
+        
+        Equivalent to calling row_from_github_data for each node, but done in
+        a single comprehension with the field getter and timestamp parser
+        bound once per page. Timestamps are naive UTC. Raises if any node is
+        malformed.
+        """
+        parse = _parse_timestamp
+        return [
+            (
+                str(node_id),
+                name,
+                owner["login"],
+                full_name,
+                description,
+                url,
+                parse(created_at) if created_at else None,
+                parse(updated_at) if updated_at else None,
+                parse(pushed_at) if pushed_at else None,
+                language["name"] if language else None,
+                is_private,
+                is_fork,
+                is_archived,
+            )
+            for (node_id, name, owner, full_name, description, url,
+                 created_at, updated_at, pushed_at, language,
+                 is_private, is_fork, is_archived) in map(_NODE_FIELDS, nodes)
+        ]
 
 
-@dataclass(frozen=True)
-class RepositoryStar:
+class RepositoryStar(NamedTuple):
     """Immutable repository star count data model"""
     repository_id: str
     star_count: int
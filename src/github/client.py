@@ -1,12 +1,27 @@
 """GitHub GraphQL API client"""
+import asyncio
+import json
+import aiohttp
 import requests
 import time
-from typing import Dict, List, Optional, Any
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Mapping, Optional, Any
 from src.config import Config
-from src.github.rate_limiter import RateLimiter
+from src.github.rate_limiter import RateLimiter, retry_after_from_headers
 from src.github.queries import REPOSITORY_SEARCH_QUERY, REPOSITORY_QUERY
 
+try:
+    import orjson
+except ImportError:  # Fall back to the (slower) stdlib codec
+    orjson = None
+
+
+# Attempts per query, and the exponential backoff between them (seconds)
+QUERY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 4
+RETRY_MAX_DELAY = 10
+
 
 class GitHubAPIError(Exception):
     """Custom exception for GitHub API errors"""
@@ -14,14 +29,86 @@ class GitHubAPIError(Exception):
 
 
 class RateLimitExceededError(GitHubAPIError):
-    """Exception raised when rate limit is exceeded"""
-    pass
+    """
+    Exception raised when rate limit is exceeded.
+    
+    retry_after is the number of seconds GitHub asked to wait before the next
+    request, or None if the response did not say.
+    """
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _dumps(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+@lru_cache(maxsize=32)
+def _payload_prefix(query: str) -> bytes:
+    """Encoded start of a request payload for query, up to its variables"""
+    return _dumps({"query": query})[:-1] + b',"variables":'
+
+
+def _encode_payload(query: str, variables: Optional[Dict[str, Any]]) -> bytes:
+    """
+    Encode a GraphQL request payload.
+    
+    Queries are long constant strings, so each one is encoded once and only
+    the variables are encoded per request.
+    """
+    return _payload_prefix(query) + _dumps(variables or {}) + b"}"
+
+
+def _decode_response(body: bytes) -> Dict[str, Any]:
+    """Decode a JSON response body, using orjson when available"""
+    try:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+    except ValueError as e:
+        raise GitHubAPIError(f"Invalid JSON response: {e}")
+
+
+def _retry_delay(attempt: int) -> float:
+    """Backoff before retrying after the given (zero-based) failed attempt"""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+
+
+def _raise_for_graphql_errors(data: Dict[str, Any], headers: Mapping[str, str]):
+    """Raise the matching exception if a GraphQL response carries errors"""
+    if "errors" not in data:
+        return
+    
+    error_messages = [err.get("message", "Unknown error") for err in data["errors"]]
+    error_type = data["errors"][0].get("type", "UNKNOWN")
+    
+    if "RATE_LIMITED" in error_type or "rate limit" in " ".join(error_messages).lower():
+        raise RateLimitExceededError(
+            f"Rate limit exceeded: {', '.join(error_messages)}",
+            retry_after=retry_after_from_headers(headers)
+        )
+    
+    raise GitHubAPIError(f"GraphQL errors: {', '.join(error_messages)}")
 
 
 class GitHubClient:
-    """Client for interacting with GitHub GraphQL API"""
+    """
+    Client for interacting with GitHub GraphQL API.
+    
+    Requests go through a persistent session, so the TCP and TLS connection
+    to the API is reused across queries instead of being set up per request.
+    """
     
-    def __init__(self, token: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         self.token = token or Config.GITHUB_TOKEN
         if not self.token:
             raise ValueError("GitHub token is required")
@@ -29,22 +116,37 @@ class GitHubClient:
         self.api_url = Config.GITHUB_API_URL
         self.rate_limiter = rate_limiter or RateLimiter(
             points_per_hour=Config.RATE_LIMIT_POINTS_PER_HOUR,
-            reset_window=Config.RATE_LIMIT_POINTS_RESET_WINDOW
+            reset_window=Config.RATE_LIMIT_POINTS_RESET_WINDOW,
+            pacing_reserve=Config.RATE_LIMIT_PACING_RESERVE,
+            pacing_burst=Config.RATE_LIMIT_PACING_BURST
         )
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
         }
+        
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Retries are handled by execute_query, not by urllib3
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=Config.MAX_CONNECTIONS_PER_HOST,
+            max_retries=0
+        )
+        self.session.mount("https://", adapter)
+    
+    def close(self):
+        """Close the HTTP session and its pooled connections"""
+        self.session.close()
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((requests.RequestException, GitHubAPIError))
-    )
     def execute_query(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Execute a GraphQL query with retry logic and rate limiting.
         
+        Failed requests are retried with exponential backoff, up to
+        QUERY_ATTEMPTS attempts. Rate limit errors are not retried here; they
+        are raised so the caller can back off.
+        
         Args:
             query: GraphQL query string
             variables: Query variables
@@ -52,51 +154,53 @@ class GitHubClient:
         Returns:
             Response data from GitHub API
         """
+        for attempt in range(QUERY_ATTEMPTS):
+            try:
+                return self._send_query(query, variables)
+            except RateLimitExceededError:
+                raise
+            except GitHubAPIError:
+                if attempt == QUERY_ATTEMPTS - 1:
+                    raise
+                time.sleep(_retry_delay(attempt))
+    
+    def _send_query(self, query: str, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Send one GraphQL request, raising GitHubAPIError on failure"""
         # Wait if rate limit would be exceeded
         self.rate_limiter.wait_if_needed(cost=1)
-        
-        payload = {
-            "query": query,
-            "variables": variables or {}
-        }
+        self.rate_limiter.pace()
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                json=payload,
-                headers=self.headers,
+                data=_encode_payload(query, variables),
                 timeout=30
             )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Check for GraphQL errors
-            if "errors" in data:
-                error_messages = [err.get("message", "Unknown error") for err in data["errors"]]
-                error_type = data["errors"][0].get("type", "UNKNOWN")
-                
-                if "RATE_LIMITED" in error_type or "rate limit" in " ".join(error_messages).lower():
-                    raise RateLimitExceededError(f"Rate limit exceeded: {', '.join(error_messages)}")
-                
-                raise GitHubAPIError(f"GraphQL errors: {', '.join(error_messages)}")
-            
-            # Update rate limiter based on response
-            if "data" in data and "rateLimit" in data.get("data", {}):
-                rate_limit_info = data["data"]["rateLimit"]
-                # We track rate limits manually, but this provides additional info
-            
-            # Record the request
+        except requests.exceptions.RequestException as e:
+            raise GitHubAPIError(f"Request failed: {e}")
+        
+        # Prefer the rate limit reported by GitHub; count locally otherwise.
+        # Applied before any error is raised, since rate-limited responses
+        # are the ones saying when the budget resets
+        if not self.rate_limiter.update_from_headers(response.headers):
             self.rate_limiter.record_request(cost=1)
-            
-            return data.get("data", {})
-            
+        
+        if response.status_code == 403:
+            raise RateLimitExceededError(
+                "Rate limit exceeded (HTTP 403)",
+                retry_after=retry_after_from_headers(response.headers)
+            )
+        try:
+            response.raise_for_status()
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                raise RateLimitExceededError("Rate limit exceeded (HTTP 403)")
             raise GitHubAPIError(f"HTTP error: {e}")
-        except requests.exceptions.RequestException as e:
-            raise GitHubAPIError(f"Request failed: {e}")
+        
+        data = _decode_response(response.content)
+        
+        # Check for GraphQL errors
+        _raise_for_graphql_errors(data, response.headers)
+        
+        return data.get("data", {})
     
     def search_repositories(
         self, 
@@ -155,3 +259,166 @@ class GitHubClient:
             "reset_at": status.reset_at.isoformat()
         }
 
+
+
+class AsyncGitHubClient:
+    """
+    Asynchronous client for the GitHub GraphQL API.
+    
+    Keeps several queries in flight over a shared connection pool. The number
+    of concurrent requests is bounded by a semaphore so that GitHub's secondary
+    rate limits are not tripped. Use as an async context manager:
+    
+        async with AsyncGitHubClient() as client:
+            result = await client.search_repositories("stars:>0")
+    """
+    
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS,
+        connections_per_host: int = Config.MAX_CONNECTIONS_PER_HOST
+    ):
+        self.token = token or Config.GITHUB_TOKEN
+        if not self.token:
+            raise ValueError("GitHub token is required")
+        
+        self.api_url = Config.GITHUB_API_URL
+        self.rate_limiter = rate_limiter or RateLimiter(
+            points_per_hour=Config.RATE_LIMIT_POINTS_PER_HOUR,
+            reset_window=Config.RATE_LIMIT_POINTS_RESET_WINDOW,
+            pacing_reserve=Config.RATE_LIMIT_PACING_RESERVE,
+            pacing_burst=Config.RATE_LIMIT_PACING_BURST
+        )
+        self.headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+        self.max_concurrency = max_concurrency
+        self.connections_per_host = connections_per_host
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def __aenter__(self) -> "AsyncGitHubClient":
+        await self.open()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def open(self):
+        """Create the HTTP session (must be called from a running event loop)"""
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit_per_host=self.connections_per_host),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+    
+    async def close(self):
+        """Close the HTTP session and its pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._semaphore = None
+    
+    async def execute_query(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute a GraphQL query with retry logic and rate limiting.
+        
+        Failed requests are retried with exponential backoff, up to
+        QUERY_ATTEMPTS attempts. Rate limit errors are not retried here; they
+        are raised so the caller can back off.
+        
+        Args:
+            query: GraphQL query string
+            variables: Query variables
+            
+        Returns:
+            Response data from GitHub API
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncGitHubClient must be opened before use")
+        
+        for attempt in range(QUERY_ATTEMPTS):
+            try:
+                return await self._send_query(query, variables)
+            except RateLimitExceededError:
+                raise
+            except GitHubAPIError:
+                if attempt == QUERY_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(_retry_delay(attempt))
+    
+    async def _send_query(self, query: str, variables: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Send one GraphQL request, raising GitHubAPIError on failure"""
+        # Wait if rate limit would be exceeded, and hold this request's points
+        # until GitHub has answered
+        await self.rate_limiter.acquire_async(cost=1)
+        try:
+            async with self._semaphore:
+                async with self._session.post(self.api_url, data=_encode_payload(query, variables)) as response:
+                    headers = response.headers
+                    
+                    # Prefer the rate limit reported by GitHub; count locally
+                    # otherwise. Applied before any error is raised, since
+                    # rate-limited responses are the ones saying when the
+                    # budget resets
+                    if not self.rate_limiter.update_from_headers(headers):
+                        self.rate_limiter.record_request(cost=1)
+                    
+                    if response.status == 403:
+                        raise RateLimitExceededError(
+                            "Rate limit exceeded (HTTP 403)",
+                            retry_after=retry_after_from_headers(headers)
+                        )
+                    if response.status >= 400:
+                        raise GitHubAPIError(f"HTTP error: {response.status} {response.reason}")
+                    
+                    data = _decode_response(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise GitHubAPIError(f"Request failed: {e}")
+        finally:
+            self.rate_limiter.release(cost=1)
+        
+        # Check for GraphQL errors
+        _raise_for_graphql_errors(data, headers)
+        
+        return data.get("data", {})
+    
+    async def search_repositories(
+        self,
+        query: str = "stars:>0",
+        first: int = 100,
+        after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Search for repositories using GraphQL.
+        
+        Args:
+            query: Search query string
+            first: Number of results per page
+            after: Cursor for pagination
+            
+        Returns:
+            Search results with repositories and pagination info
+        """
+        variables = {
+            "query": query,
+            "first": min(first, 100),  # GitHub max is 100
+            "after": after
+        }
+        
+        return await self.execute_query(REPOSITORY_SEARCH_QUERY, variables)
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        """Get current rate limit status"""
+        status = self.rate_limiter.get_status()
+        return {
+            "remaining": status.remaining,
+            "used": status.used,
+            "limit": status.limit,
+            "reset_at": status.reset_at.isoformat()
+        }
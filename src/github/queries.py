@@ -1,5 +1,8 @@
 """GraphQL queries for GitHub API"""
 
+# The queries do not select rateLimit: the clients read the same limit,
+# remaining and reset values from the X-RateLimit-* headers of every response
+
 # Query to search for repositories and get their star counts
 # Using search to get a diverse set of repositories
 REPOSITORY_SEARCH_QUERY = """
@@ -33,12 +36,6 @@ query SearchRepositories($query: String!, $first: Int!, $after: String) {
       }
     }
   }
-  rateLimit {
-    limit
-    cost
-    remaining
-    resetAt
-  }
 }
 """
 
@@ -74,12 +71,6 @@ query GetRepositories($first: Int!, $after: String) {
       }
     }
   }
-  rateLimit {
-    limit
-    cost
-    remaining
-    resetAt
-  }
 }
 """
 
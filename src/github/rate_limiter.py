@@ -1,10 +1,38 @@
 """Rate limiting for GitHub API"""
+import asyncio
+import logging
 import time
-from typing import Optional
+from typing import Mapping, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 
+logger = logging.getLogger(__name__)
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Seconds to wait before retrying a rate-limited request, from its headers.
+    
+    Uses Retry-After when GitHub sends it (secondary rate limits), otherwise
+    the time until X-RateLimit-Reset once X-RateLimit-Remaining is 0.
+    
+    Returns:
+        Delay in seconds, or None if the headers do not say
+    """
+    try:
+        return max(0.0, float(headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        pass
+    
+    try:
+        if int(headers["X-RateLimit-Remaining"]) > 0:
+            return None
+        return max(0.0, int(headers["X-RateLimit-Reset"]) - time.time())
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 @dataclass
 class RateLimitStatus:
     """Rate limit status information"""
@@ -15,49 +43,192 @@ class RateLimitStatus:
 
 
 class RateLimiter:
-    """Manages GitHub API rate limiting"""
+    """
+    Manages GitHub API rate limiting.
+    
+    Async callers go through acquire_async/release, which count points for
+    requests that are still in flight, so concurrent tasks cannot overspend
+    the budget between checking it and hearing back from GitHub.
+    """
     
-    def __init__(self, points_per_hour: int = 5000, reset_window: int = 3600):
+    def __init__(
+        self,
+        points_per_hour: int = 5000,
+        reset_window: int = 3600,
+        pacing_reserve: int = 0,
+        pacing_burst: int = 1
+    ):
+        """
+        Args:
+            points_per_hour: Points available per window
+            reset_window: Window length in seconds
+            pacing_reserve: Once remaining points drop to this level, requests
+                are spread evenly over the rest of the window instead of
+                being sent as fast as possible
+            pacing_burst: Requests that may start back to back while pacing
+        """
         self.points_per_hour = points_per_hour
         self.reset_window = reset_window
+        self.pacing_reserve = pacing_reserve
+        self.pacing_burst = pacing_burst
         self.points_used = 0
-        self.window_start = datetime.utcnow()
-        self.last_request_time: Optional[datetime] = None
+        # Window bookkeeping uses time.monotonic(), which is cheap and immune
+        # to wall-clock adjustments; datetimes are only built for get_status()
+        self.window_start = time.monotonic()
+        self.last_request_time: Optional[float] = None
+        # Pacing token bucket; a negative balance is owed by waiting requests
+        self._tokens = float(pacing_burst)
+        self._last_refill = time.monotonic()
+        # Points reserved by async requests that have not completed yet
+        self._in_flight = 0
+        # Serialises async waits for the window to reset (created per event loop)
+        self._wait_lock: Optional[asyncio.Lock] = None
+        self._wait_lock_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def can_make_request(self, cost: int = 1) -> bool:
         """Check if a request can be made without exceeding rate limit"""
         self._reset_if_needed()
-        return (self.points_used + cost) <= self.points_per_hour
+        return (self.points_used + self._in_flight + cost) <= self.points_per_hour
     
     def record_request(self, cost: int = 1):
         """Record that a request was made"""
         self._reset_if_needed()
         self.points_used += cost
-        self.last_request_time = datetime.utcnow()
+        self.last_request_time = time.monotonic()
+    
+    def update_from_headers(self, headers: Mapping[str, str]) -> bool:
+        """
+        Synchronise with the rate limit GitHub reports in response headers.
+        
+        Uses X-RateLimit-Limit, X-RateLimit-Remaining and X-RateLimit-Reset
+        (epoch seconds). The server's numbers already include the request that
+        produced them, so callers should not also record it.
+        
+        Returns:
+            True if the headers were present and applied
+        """
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_epoch = int(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        
+        now = time.monotonic()
+        reset_at = now + (reset_epoch - time.time())
+        self.points_per_hour = limit
+        self.points_used = limit - remaining
+        self.window_start = reset_at - self.reset_window
+        self.last_request_time = now
+        return True
     
     def wait_if_needed(self, cost: int = 1):
         """Wait if necessary to avoid rate limit"""
         if not self.can_make_request(cost):
             wait_time = self._calculate_wait_time()
             if wait_time > 0:
-                print(f"Rate limit reached. Waiting {wait_time:.2f} seconds...")
+                logger.warning("Rate limit reached. Waiting %.2f seconds...", wait_time)
                 time.sleep(wait_time)
                 self._reset_if_needed()
     
+    async def wait_if_needed_async(self, cost: int = 1):
+        """
+        Wait if necessary to avoid rate limit, without blocking the event loop.
+        
+        When the budget is exhausted, one task waits for the window to reset
+        while the others queue behind it, instead of each sleeping (and
+        reporting) on its own.
+        """
+        if self.can_make_request(cost):
+            return
+        
+        async with self._get_wait_lock():
+            # The window may have reset while waiting for the lock
+            if self.can_make_request(cost):
+                return
+            
+            wait_time = self._calculate_wait_time()
+            if wait_time > 0:
+                logger.warning("Rate limit reached. Waiting %.2f seconds...", wait_time)
+                await asyncio.sleep(wait_time)
+                self._reset_if_needed()
+    
+    async def acquire_async(self, cost: int = 1):
+        """
+        Wait until a request fits the budget and reserve its points.
+        
+        Every call must be paired with release() once the request completes.
+        """
+        await self.wait_if_needed_async(cost)
+        await self.pace_async()
+        self._in_flight += cost
+    
+    def release(self, cost: int = 1):
+        """Release points reserved by acquire_async"""
+        self._in_flight = max(0, self._in_flight - cost)
+    
+    def _get_wait_lock(self) -> asyncio.Lock:
+        """Return the wait lock for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._wait_lock is None or self._wait_lock_loop is not loop:
+            self._wait_lock = asyncio.Lock()
+            self._wait_lock_loop = loop
+        return self._wait_lock
+    
+    def pace(self):
+        """Sleep until this request may start, if pacing is in effect"""
+        delay = self._take_token()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def pace_async(self):
+        """Wait until this request may start without blocking the event loop"""
+        delay = self._take_token()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _take_token(self, cost: int = 1) -> float:
+        """
+        Take pacing tokens for a request and return how long to wait for them.
+        
+        The bucket refills at the rate that spends the points left evenly over
+        the time left in the window, and holds at most pacing_burst tokens.
+        Every point freed by elapsed time can be used straight away, and a
+        request made into an empty bucket waits only for the tokens it lacks.
+        Tokens are handed out in order, so concurrent callers queue behind
+        each other instead of bunching up.
+        """
+        self._reset_if_needed()
+        remaining = self.points_per_hour - self.points_used - self._in_flight
+        now = time.monotonic()
+        if remaining > self.pacing_reserve:
+            self._tokens = float(self.pacing_burst)
+            self._last_refill = now
+            return 0.0
+        
+        rate = max(remaining, 1) / max(self._calculate_wait_time(), 1.0)
+        self._tokens = min(
+            float(self.pacing_burst),
+            self._tokens + (now - self._last_refill) * rate
+        )
+        self._last_refill = now
+        self._tokens -= cost
+        
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / rate
+    
     def _reset_if_needed(self):
         """Reset points if window has passed"""
-        now = datetime.utcnow()
-        elapsed = (now - self.window_start).total_seconds()
+        now = time.monotonic()
         
-        if elapsed >= self.reset_window:
+        if now - self.window_start >= self.reset_window:
             self.points_used = 0
             self.window_start = now
     
     def _calculate_wait_time(self) -> float:
         """Calculate how long to wait before next request"""
-        now = datetime.utcnow()
-        elapsed = (now - self.window_start).total_seconds()
-        remaining = self.reset_window - elapsed
+        remaining = self.window_start + self.reset_window - time.monotonic()
         
         if remaining > 0:
             return remaining
@@ -66,7 +237,7 @@ class RateLimiter:
     def get_status(self) -> RateLimitStatus:
         """Get current rate limit status"""
         self._reset_if_needed()
-        reset_at = self.window_start + timedelta(seconds=self.reset_window)
+        reset_at = datetime.utcnow() + timedelta(seconds=self._calculate_wait_time())
         return RateLimitStatus(
             remaining=self.points_per_hour - self.points_used,
             reset_at=reset_at,